@@ -29,29 +29,38 @@ import utils
 keyspace_id_type = keyrange_constants.KIT_UINT64
 pack_keyspace_id = struct.Struct('!Q').pack
 
+
+# keyspace_id_type is read when these are called, not at import time:
+# merge_sharding_bytes.py changes it after importing this module.
+def transform_keyspace_id(custom_sharding_key):
+  """Returns the custom sharding key as MySQL returns it for this test."""
+  if keyspace_id_type == keyrange_constants.KIT_BYTES:
+    return pack_keyspace_id(custom_sharding_key)
+  return custom_sharding_key
+
+
+def keyspace_id_fmt():
+  """Returns the format used to print a transformed custom sharding key."""
+  if keyspace_id_type == keyrange_constants.KIT_BYTES:
+    return '%s'
+  return '%x'
+
+
+# number of rows _insert_lots puts in each insert statement / transaction
+insert_batch_size = 500
+
+all_tablets = tablet.reserve_tablets(12)
+
 # initial shards
 # shard -40
-shard_0_master = tablet.Tablet()
-shard_0_replica = tablet.Tablet()
-shard_0_rdonly = tablet.Tablet()
+shard_0_master, shard_0_replica, shard_0_rdonly = all_tablets[0:3]
 # shard 40-80
-shard_1_master = tablet.Tablet()
-shard_1_replica = tablet.Tablet()
-shard_1_rdonly = tablet.Tablet()
+shard_1_master, shard_1_replica, shard_1_rdonly = all_tablets[3:6]
 # shard 80-
-shard_2_master = tablet.Tablet()
-shard_2_replica = tablet.Tablet()
-shard_2_rdonly = tablet.Tablet()
+shard_2_master, shard_2_replica, shard_2_rdonly = all_tablets[6:9]
 
 # merged shard -80
-shard_dest_master = tablet.Tablet()
-shard_dest_replica = tablet.Tablet()
-shard_dest_rdonly = tablet.Tablet()
-
-all_tablets = [shard_0_master, shard_0_replica, shard_0_rdonly,
-               shard_1_master, shard_1_replica, shard_1_rdonly,
-               shard_2_master, shard_2_replica, shard_2_rdonly,
-               shard_dest_master, shard_dest_replica, shard_dest_rdonly]
+shard_dest_master, shard_dest_replica, shard_dest_rdonly = all_tablets[9:12]
 
 
 def setUpModule():
@@ -75,12 +84,16 @@ def tearDownModule():
   environment.topo_server().teardown()
   utils.kill_sub_processes()
   utils.remove_tmp_files()
-  for t in all_tablets:
-    t.remove_tree()
+  utils.parallel([t.remove_tree for t in all_tablets])
 
 
 class TestMergeSharding(unittest.TestCase, base_sharding.BaseShardingTest):
 
+  def setUp(self):
+    # ids of the _insert_lots rows already verified by _check_lots_timeout,
+    # indexed by (count, base)
+    self.lots_found = {}
+
   # create_schema will create the same schema on the keyspace
   # then insert some values
   def _create_schema(self):
@@ -100,12 +113,13 @@ index by_msg (msg)
         '(id, msg, custom_sharding_key) as select id, msg, custom_sharding_key '
         'from %s')
 
+    # both tables are created by a single ApplySchema. The view has to be
+    # separate: each statement is preflighted against the current schema,
+    # where resharding1 doesn't exist yet.
     utils.run_vtctl(['ApplySchema',
-                     '-sql=' + create_table_template % ('resharding1'),
-                     'test_keyspace'],
-                    auto_log=True)
-    utils.run_vtctl(['ApplySchema',
-                     '-sql=' + create_table_template % ('resharding2'),
+                     '-sql=' + ';'.join([
+                         create_table_template % ('resharding1'),
+                         create_table_template % ('resharding2')]),
                      'test_keyspace'],
                     auto_log=True)
     utils.run_vtctl(['ApplySchema',
@@ -114,73 +128,67 @@ index by_msg (msg)
                     auto_log=True)
 
   # _insert_value inserts a value in the MySQL database along with the comments
-  # required for routing.
+  # required for routing. mquery(write=True) runs it in its own transaction.
   def _insert_value(self, tablet_obj, table, mid, msg, custom_sharding_key):
     k = utils.uint64_to_hex(custom_sharding_key)
     tablet_obj.mquery(
         'vt_test_keyspace',
-        ['begin',
-         'insert into %s(id, msg, custom_sharding_key) '
-         'values(%d, "%s", 0x%x) /* vtgate:: keyspace_id:%s */ '
-         '/* id:%d */' %
-         (table, mid, msg, custom_sharding_key, k, mid),
-         'commit'],
+        'insert into %s(id, msg, custom_sharding_key) '
+        'values(%d, "%s", 0x%x) /* vtgate:: keyspace_id:%s */ '
+        '/* id:%d */' %
+        (table, mid, msg, custom_sharding_key, k, mid),
+        write=True)
+
+  # _insert_values_batch inserts multiple rows in a single multi-row insert
+  # statement, in one transaction. values iterates over the already formatted
+  # '(id, msg, custom_sharding_key) /* vtgate:: keyspace_id:... */' tuples,
+  # so each row keeps its own routing comment.
+  def _insert_values_batch(self, tablet_obj, table, values):
+    tablet_obj.mquery(
+        'vt_test_keyspace',
+        'insert into %s(id, msg, custom_sharding_key) values%s' %
+        (table, ', '.join(values)),
         write=True)
 
-  def _get_value(self, tablet_obj, table, mid):
-    """Returns the row(s) from the table for the provided id, using MySQL.
+  def _get_values_bulk(self, tablet_obj, table, ids):
+    """Returns the rows from the table for the provided ids, using MySQL.
+
+    The ids are queried in chunks of 1000, to keep each query small.
 
     Args:
       tablet_obj: the tablet to get data from.
       table: the table to query.
-      mid: id field of the table.
+      ids: list of id fields of the table.
     Returns:
-      A tuple of results.
+      A dict of the rows found, indexed by id.
     """
-    return tablet_obj.mquery(
-        'vt_test_keyspace',
-        'select id, msg, custom_sharding_key from %s where id=%d' %
-        (table, mid))
+    result = {}
+    for i in xrange(0, len(ids), 1000):
+      rows = tablet_obj.mquery(
+          'vt_test_keyspace',
+          'select id, msg, custom_sharding_key from %s where id in (%s)' %
+          (table, ', '.join('%d' % mid for mid in ids[i:i + 1000])))
+      for row in rows:
+        result[row[0]] = row
+    return result
+
+  def _check_values_bulk(self, tablet_obj, table, expected):
+    """Checks the provided rows are in the table, using a single query.
 
-  def _check_value(self, tablet_obj, table, mid, msg, custom_sharding_key,
-                   should_be_here=True):
-    result = self._get_value(tablet_obj, table, mid)
-    if keyspace_id_type == keyrange_constants.KIT_BYTES:
-      fmt = '%s'
-      custom_sharding_key = pack_keyspace_id(custom_sharding_key)
-    else:
-      fmt = '%x'
-    if should_be_here:
-      self.assertEqual(result, ((mid, msg, custom_sharding_key),),
+    Args:
+      tablet_obj: the tablet to get data from.
+      table: the table to query.
+      expected: list of (id, msg, custom_sharding_key) tuples.
+    """
+    rows = self._get_values_bulk(tablet_obj, table,
+                                 [mid for mid, _, _ in expected])
+    for mid, msg, custom_sharding_key in expected:
+      custom_sharding_key = transform_keyspace_id(custom_sharding_key)
+      self.assertEqual(rows.get(mid), (mid, msg, custom_sharding_key),
                        ('Bad row in tablet %s for id=%d, custom_sharding_key=' +
-                        fmt + ', row=%s') % (tablet_obj.tablet_alias, mid,
-                                             custom_sharding_key, str(result)))
-    else:
-      self.assertEqual(
-          len(result), 0,
-          ('Extra row in tablet %s for id=%d, custom_sharding_key=' +
-           fmt + ': %s') % (tablet_obj.tablet_alias, mid, custom_sharding_key,
-                            str(result)))
-
-  # _is_value_present_and_correct tries to read a value.
-  # if it is there, it will check it is correct and return True if it is.
-  # if not correct, it will self.fail.
-  # if not there, it will return False.
-  def _is_value_present_and_correct(
-      self, tablet_obj, table, mid, msg, custom_sharding_key):
-    result = self._get_value(tablet_obj, table, mid)
-    if not result:
-      return False
-    if keyspace_id_type == keyrange_constants.KIT_BYTES:
-      fmt = '%s'
-      custom_sharding_key = pack_keyspace_id(custom_sharding_key)
-    else:
-      fmt = '%x'
-    self.assertEqual(result, ((mid, msg, custom_sharding_key),),
-                     ('Bad row in tablet %s for id=%d, '
-                      'custom_sharding_key=' + fmt) % (
-                          tablet_obj.tablet_alias, mid, custom_sharding_key))
-    return True
+                        keyspace_id_fmt() + ', row=%s') % (
+                            tablet_obj.tablet_alias, mid, custom_sharding_key,
+                            str(rows.get(mid))))
 
   def _insert_startup_values(self):
     self._insert_value(shard_0_master, 'resharding1', 0, 'msg1',
@@ -192,54 +200,73 @@ index by_msg (msg)
 
   def _check_startup_values(self):
     # check first two values are in the right shard
-    self._check_value(shard_dest_master, 'resharding1', 0, 'msg1',
-                      0x1000000000000000)
-    self._check_value(shard_dest_replica, 'resharding1', 0, 'msg1',
-                      0x1000000000000000)
-    self._check_value(shard_dest_rdonly, 'resharding1', 0, 'msg1',
-                      0x1000000000000000)
-
-    self._check_value(shard_dest_master, 'resharding1', 1, 'msg2',
-                      0x5000000000000000)
-    self._check_value(shard_dest_replica, 'resharding1', 1, 'msg2',
-                      0x5000000000000000)
-    self._check_value(shard_dest_rdonly, 'resharding1', 1, 'msg2',
-                      0x5000000000000000)
+    for t in [shard_dest_master, shard_dest_replica, shard_dest_rdonly]:
+      self._check_values_bulk(t, 'resharding1',
+                              [(0, 'msg1', 0x1000000000000000),
+                               (1, 'msg2', 0x5000000000000000)])
 
   def _insert_lots(self, count, base=0):
     if count > 10000:
       self.assertFail('bad count passed in, only support up to 10000')
-    for i in xrange(count):
-      self._insert_value(shard_0_master, 'resharding1', 1000000 + base + i,
-                         'msg-range0-%d' % i, 0x2000000000000000 + base + i)
-      self._insert_value(shard_1_master, 'resharding1', 1010000 + base + i,
-                         'msg-range1-%d' % i, 0x6000000000000000 + base + i)
+    # the keyspace_id comment is formatted inline, count is small enough
+    # for the keys to always fit in 64 bits. The values are generated batch
+    # by batch, straight into the join, to avoid building count-sized lists.
+    fmt = '(%d, "msg-range%d-%d", 0x%x) /* vtgate:: keyspace_id:%016X */'
+    for start in xrange(0, count, insert_batch_size):
+      batch = xrange(start, min(start + insert_batch_size, count))
+      self._insert_values_batch(
+          shard_0_master, 'resharding1',
+          (fmt % (1000000 + base + i, 0, i, 0x2000000000000000 + base + i,
+                  0x2000000000000000 + base + i) for i in batch))
+      self._insert_values_batch(
+          shard_1_master, 'resharding1',
+          (fmt % (1010000 + base + i, 1, i, 0x6000000000000000 + base + i,
+                  0x6000000000000000 + base + i) for i in batch))
 
   # _check_lots returns how many of the values we have, in percents.
-  def _check_lots(self, count, base=0):
-    found = 0
-    for i in xrange(count):
-      if self._is_value_present_and_correct(shard_dest_replica, 'resharding1',
-                                            1000000 + base + i,
-                                            'msg-range0-%d' % i,
-                                            0x2000000000000000 + base + i):
-        found += 1
-      if self._is_value_present_and_correct(shard_dest_replica, 'resharding1',
-                                            1010000 + base + i,
-                                            'msg-range1-%d' % i,
-                                            0x6000000000000000 + base + i):
-        found += 1
-    percent = found * 100 / count / 2
+  # If known_found is set, the ids it contains are not read again, and the
+  # ids found and verified by this call are added to it.
+  def _check_lots(self, count, base=0, known_found=None):
+    if known_found is None:
+      known_found = set()
+    expected0 = [(1000000 + base + i, 'msg-range0-%d' % i,
+                  0x2000000000000000 + base + i) for i in xrange(count)
+                 if 1000000 + base + i not in known_found]
+    expected1 = [(1010000 + base + i, 'msg-range1-%d' % i,
+                  0x6000000000000000 + base + i) for i in xrange(count)
+                 if 1010000 + base + i not in known_found]
+    for expected in [expected0, expected1]:
+      rows = self._get_values_bulk(shard_dest_replica, 'resharding1',
+                                   [row[0] for row in expected])
+      for mid, msg, custom_sharding_key in expected:
+        if mid not in rows:
+          continue
+        custom_sharding_key = transform_keyspace_id(custom_sharding_key)
+        self.assertEqual(rows[mid], (mid, msg, custom_sharding_key),
+                         ('Bad row in tablet %s for id=%d, '
+                          'custom_sharding_key=' + keyspace_id_fmt()) % (
+                              shard_dest_replica.tablet_alias, mid,
+                              custom_sharding_key))
+        known_found.add(mid)
+    percent = len(known_found) * 100 / count / 2
     logging.debug('I have %d%% of the data', percent)
     return percent
 
   def _check_lots_timeout(self, count, threshold, timeout, base=0):
+    # poll with exponential backoff, from 50ms up to 1s between checks,
+    # only reading the rows that were not found yet. The rows found are
+    # remembered across calls, so once everything was seen we're done.
+    known_found = self.lots_found.setdefault((count, base), set())
+    if len(known_found) == 2 * count:
+      return 100
+    sleep_time = 0.05
     while True:
-      value = self._check_lots(count, base=base)
+      value = self._check_lots(count, base=base, known_found=known_found)
       if value >= threshold:
         return value
       timeout = utils.wait_step('waiting for %d%% of the data' % threshold,
-                                timeout, sleep_time=1)
+                                timeout, sleep_time=sleep_time)
+      sleep_time = min(sleep_time * 2, 1.0)
 
   def test_merge_sharding(self):
     utils.run_vtctl(['CreateKeyspace',
@@ -248,31 +275,40 @@ index by_msg (msg)
                      '--split_shard_count', '4',
                      'test_keyspace'])
 
-    shard_0_master.init_tablet('master', 'test_keyspace', '-40')
-    shard_0_replica.init_tablet('replica', 'test_keyspace', '-40')
-    shard_0_rdonly.init_tablet('rdonly', 'test_keyspace', '-40')
-    shard_1_master.init_tablet('master', 'test_keyspace', '40-80')
-    shard_1_replica.init_tablet('replica', 'test_keyspace', '40-80')
-    shard_1_rdonly.init_tablet('rdonly', 'test_keyspace', '40-80')
-    shard_2_master.init_tablet('master', 'test_keyspace', '80-')
-    shard_2_replica.init_tablet('replica', 'test_keyspace', '80-')
-    shard_2_rdonly.init_tablet('rdonly', 'test_keyspace', '80-')
+    # the tablets of the three initial shards
+    source_tablets = (shard_0_master, shard_0_replica, shard_0_rdonly,
+                      shard_1_master, shard_1_replica, shard_1_rdonly,
+                      shard_2_master, shard_2_replica, shard_2_rdonly)
+
+    # the tablet records are independent, create them concurrently
+    utils.parallel([
+        lambda t=t, tablet_type=tablet_type, shard=shard: t.init_tablet(
+            tablet_type, 'test_keyspace', shard)
+        for t, tablet_type, shard in [
+            (shard_0_master, 'master', '-40'),
+            (shard_0_replica, 'replica', '-40'),
+            (shard_0_rdonly, 'rdonly', '-40'),
+            (shard_1_master, 'master', '40-80'),
+            (shard_1_replica, 'replica', '40-80'),
+            (shard_1_rdonly, 'rdonly', '40-80'),
+            (shard_2_master, 'master', '80-'),
+            (shard_2_replica, 'replica', '80-'),
+            (shard_2_rdonly, 'rdonly', '80-')]])
 
     utils.run_vtctl(['RebuildKeyspaceGraph', 'test_keyspace'], auto_log=True)
 
     ks = utils.run_vtctl_json(['GetSrvKeyspace', 'test_nj', 'test_keyspace'])
     self.assertEqual(ks['split_shard_count'], 4)
 
-    # create databases so vttablet can start behaving normally
-    for t in [shard_0_master, shard_0_replica, shard_0_rdonly,
-              shard_1_master, shard_1_replica, shard_1_rdonly,
-              shard_2_master, shard_2_replica, shard_2_rdonly]:
-      t.create_db('vt_test_keyspace')
+    # create databases so vttablet can start behaving normally.
+    # start_vttablet updates shared process bookkeeping (Tablet counters,
+    # utils.pid_map), so it stays on the main thread.
+    utils.parallel([lambda t=t: t.create_db('vt_test_keyspace')
+                    for t in source_tablets])
+    for t in source_tablets:
       t.start_vttablet(wait_for_state=None)
 
-    for t in [shard_0_master, shard_0_replica, shard_0_rdonly,
-              shard_1_master, shard_1_replica, shard_1_rdonly,
-              shard_2_master, shard_2_replica, shard_2_rdonly]:
+    for t in source_tablets:
       t.wait_for_vttablet_state('SERVING')
 
     # reparent to make the tablets work
@@ -289,15 +325,21 @@ index by_msg (msg)
 
     # run a health check on source replicas so they respond to discovery
     # (for binlog players) and on the source rdonlys (for workers)
-    for t in [shard_0_replica, shard_1_replica]:
-      utils.run_vtctl(['RunHealthCheck', t.tablet_alias, 'replica'])
-    for t in [shard_0_rdonly, shard_1_rdonly]:
-      utils.run_vtctl(['RunHealthCheck', t.tablet_alias, 'rdonly'])
+    utils.parallel(
+        [lambda t=t, tablet_type=tablet_type: utils.run_vtctl(
+            ['RunHealthCheck', t.tablet_alias, tablet_type])
+         for t, tablet_type in [(shard_0_replica, 'replica'),
+                                (shard_1_replica, 'replica'),
+                                (shard_0_rdonly, 'rdonly'),
+                                (shard_1_rdonly, 'rdonly')]])
 
     # create the merge shards
-    shard_dest_master.init_tablet('master', 'test_keyspace', '-80')
-    shard_dest_replica.init_tablet('replica', 'test_keyspace', '-80')
-    shard_dest_rdonly.init_tablet('rdonly', 'test_keyspace', '-80')
+    utils.parallel([
+        lambda t=t, tablet_type=tablet_type: t.init_tablet(
+            tablet_type, 'test_keyspace', '-80')
+        for t, tablet_type in [(shard_dest_master, 'master'),
+                               (shard_dest_replica, 'replica'),
+                               (shard_dest_rdonly, 'rdonly')]])
 
     # start vttablet on the split shards (no db created,
     # so they're all not serving)
@@ -332,10 +374,10 @@ index by_msg (msg)
                         '--min_healthy_rdonly_endpoints', '1',
                         'test_keyspace/-80'],
                        auto_log=True)
-    utils.run_vtctl(['ChangeSlaveType', shard_0_rdonly.tablet_alias,
-                     'rdonly'], auto_log=True)
-    utils.run_vtctl(['ChangeSlaveType', shard_1_rdonly.tablet_alias,
-                     'rdonly'], auto_log=True)
+    utils.parallel(
+        [lambda t=t: utils.run_vtctl(
+            ['ChangeSlaveType', t.tablet_alias, 'rdonly'], auto_log=True)
+         for t in [shard_0_rdonly, shard_1_rdonly]])
 
     # check the startup values are in the right place
     self._check_startup_values()
@@ -355,21 +397,27 @@ index by_msg (msg)
     # check we get most of it after a few seconds, wait for binlog server
     # timeout, check we get all of it.
     logging.debug('Inserting lots of data on source shards')
-    self._insert_lots(1000)
+    lots_count = 1000
+    self._insert_lots(lots_count)
     logging.debug('Checking 80 percent of data is sent quickly')
-    v = self._check_lots_timeout(1000, 80, 10)
+    v = self._check_lots_timeout(lots_count, 80, 10)
     if v != 100:
       # small optimization: only do this check if we don't have all the data
       # already anyway.
       logging.debug('Checking all data goes through eventually')
-      self._check_lots_timeout(1000, 100, 30)
+      self._check_lots_timeout(lots_count, 100, 30)
     self.check_binlog_player_vars(shard_dest_master,
                                   ['test_keyspace/-40', 'test_keyspace/40-80'],
                                   seconds_behind_master_max=30)
+    # each batch is one statement in one transaction, the last one may
+    # be partial
+    batch_count = (lots_count + insert_batch_size - 1) / insert_batch_size
     self.check_binlog_server_vars(shard_0_replica, horizontal=True,
-                                  min_statements=1000, min_transactions=1000)
+                                  min_statements=batch_count,
+                                  min_transactions=batch_count)
     self.check_binlog_server_vars(shard_1_replica, horizontal=True,
-                                  min_statements=1000, min_transactions=1000)
+                                  min_statements=batch_count,
+                                  min_transactions=batch_count)
 
     # use vtworker to compare the data (after health-checking the destination
     # rdonly tablets so discovery works)
@@ -382,10 +430,10 @@ index by_msg (msg)
                         '--source_uid', '0',
                         'test_keyspace/-80'],
                        auto_log=True)
-    utils.run_vtctl(['ChangeSlaveType', shard_0_rdonly.tablet_alias, 'rdonly'],
-                    auto_log=True)
-    utils.run_vtctl(['ChangeSlaveType', shard_dest_rdonly.tablet_alias,
-                     'rdonly'], auto_log=True)
+    utils.parallel(
+        [lambda t=t: utils.run_vtctl(
+            ['ChangeSlaveType', t.tablet_alias, 'rdonly'], auto_log=True)
+         for t in [shard_0_rdonly, shard_dest_rdonly]])
     logging.debug('Running vtworker SplitDiff on second half')
     utils.run_vtworker(['-cell', 'test_nj', 'SplitDiff',
                         '--exclude_tables', 'unrelated',
@@ -393,13 +441,14 @@ index by_msg (msg)
                         '--source_uid', '1',
                         'test_keyspace/-80'],
                        auto_log=True)
-    utils.run_vtctl(['ChangeSlaveType', shard_1_rdonly.tablet_alias, 'rdonly'],
-                    auto_log=True)
-    utils.run_vtctl(['ChangeSlaveType', shard_dest_rdonly.tablet_alias,
-                     'rdonly'], auto_log=True)
+    utils.parallel(
+        [lambda t=t: utils.run_vtctl(
+            ['ChangeSlaveType', t.tablet_alias, 'rdonly'], auto_log=True)
+         for t in [shard_1_rdonly, shard_dest_rdonly]])
 
     # get status for the destination master tablet, make sure we have it all
-    self.check_running_binlog_player(shard_dest_master, 3000, 1000)
+    self.check_running_binlog_player(shard_dest_master, 3 * batch_count,
+                                     batch_count)
 
     # check destination master query service is not running
     utils.check_tablet_query_service(self, shard_dest_master, False, False)
@@ -414,35 +463,27 @@ index by_msg (msg)
     # service is not running (if not healthy this would exception out)
     shard_dest_master.get_healthz()
 
-    # now serve rdonly from the split shards
-    utils.run_vtctl(['MigrateServedTypes', 'test_keyspace/-80', 'rdonly'],
-                    auto_log=True)
-    utils.check_srv_keyspace('test_nj', 'test_keyspace',
-                             'Partitions(master): -40 40-80 80-\n'
-                             'Partitions(rdonly): -80 80-\n'
-                             'Partitions(replica): -40 40-80 80-\n',
-                             keyspace_id_type=keyspace_id_type,
-                             sharding_column_name='custom_sharding_key')
-
-    # now serve replica from the split shards
-    utils.run_vtctl(['MigrateServedTypes', 'test_keyspace/-80', 'replica'],
-                    auto_log=True)
-    utils.check_srv_keyspace('test_nj', 'test_keyspace',
-                             'Partitions(master): -40 40-80 80-\n'
-                             'Partitions(rdonly): -80 80-\n'
-                             'Partitions(replica): -80 80-\n',
-                             keyspace_id_type=keyspace_id_type,
-                             sharding_column_name='custom_sharding_key')
-
-    # now serve master from the split shards
-    utils.run_vtctl(['MigrateServedTypes', 'test_keyspace/-80', 'master'],
-                    auto_log=True)
-    utils.check_srv_keyspace('test_nj', 'test_keyspace',
-                             'Partitions(master): -80 80-\n'
-                             'Partitions(rdonly): -80 80-\n'
-                             'Partitions(replica): -80 80-\n',
-                             keyspace_id_type=keyspace_id_type,
-                             sharding_column_name='custom_sharding_key')
+    # now serve rdonly, then replica, then master from the split shards.
+    # MigrateServedTypes rebuilds the serving graph before returning, so
+    # each step is checked with a single SrvKeyspace read.
+    for served_type, expected_partitions in [
+        ('rdonly',
+         'Partitions(master): -40 40-80 80-\n'
+         'Partitions(rdonly): -80 80-\n'
+         'Partitions(replica): -40 40-80 80-\n'),
+        ('replica',
+         'Partitions(master): -40 40-80 80-\n'
+         'Partitions(rdonly): -80 80-\n'
+         'Partitions(replica): -80 80-\n'),
+        ('master',
+         'Partitions(master): -80 80-\n'
+         'Partitions(rdonly): -80 80-\n'
+         'Partitions(replica): -80 80-\n')]:
+      utils.run_vtctl(['MigrateServedTypes', 'test_keyspace/-80', served_type],
+                      auto_log=True)
+      utils.check_srv_keyspace('test_nj', 'test_keyspace', expected_partitions,
+                               keyspace_id_type=keyspace_id_type,
+                               sharding_column_name='custom_sharding_key')
     utils.check_tablet_query_service(self, shard_0_master, False, True)
     utils.check_tablet_query_service(self, shard_1_master, False, True)
 
@@ -450,8 +491,7 @@ index by_msg (msg)
     self.check_no_binlog_player(shard_dest_master)
 
     # kill the original tablets in the original shards
-    tablet.kill_tablets([shard_0_master, shard_0_replica, shard_0_rdonly,
-                         shard_1_master, shard_1_replica, shard_1_rdonly])
+    tablet.kill_tablets(source_tablets[:6])
     for t in [shard_0_replica, shard_0_rdonly,
               shard_1_replica, shard_1_rdonly]:
       utils.run_vtctl(['DeleteTablet', t.tablet_alias], auto_log=True)
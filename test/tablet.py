@@ -88,11 +88,11 @@ class Tablet(object):
   }
 
   def __init__(self, tablet_uid=None, port=None, mysql_port=None, cell=None,
-               use_mysqlctld=False):
+               use_mysqlctld=False, grpc_port=None):
     self.tablet_uid = tablet_uid or (Tablet.default_uid + Tablet.seq)
     self.port = port or (environment.reserve_ports(1))
     self.mysql_port = mysql_port or (environment.reserve_ports(1))
-    self.grpc_port = environment.reserve_ports(1)
+    self.grpc_port = grpc_port or (environment.reserve_ports(1))
     self.use_mysqlctld = use_mysqlctld
     Tablet.seq += 1
 
@@ -808,6 +808,26 @@ class Tablet(object):
     return utils.run_vtctl(args, auto_log=auto_log)
 
 
+def reserve_tablets(count, **kwargs):
+  """Creates count Tablet objects, reserving all their ports at once.
+
+  The ports are assigned the same way as count consecutive Tablet() calls.
+
+  Args:
+    count: the number of tablets to create.
+    **kwargs: extra arguments passed to the Tablet constructor.
+
+  Returns:
+    the list of Tablet objects.
+  """
+  base_port = environment.reserve_ports(3 * count)
+  return [Tablet(port=base_port + 3 * i,
+                 mysql_port=base_port + 3 * i + 1,
+                 grpc_port=base_port + 3 * i + 2,
+                 **kwargs)
+          for i in xrange(count)]
+
+
 def kill_tablets(tablets):
   for t in tablets:
     logging.debug('killing vttablet: %s', t.tablet_alias)
@@ -13,6 +13,7 @@ import signal
 import socket
 import subprocess
 import sys
+import threading
 import time
 import unittest
 import urllib2
@@ -316,6 +317,39 @@ def wait_procs(proc_list, raise_on_error=True):
                                             ' '.join(proc.args))
 
 
+def parallel(funcs):
+  """Runs the provided callables concurrently, one thread each.
+
+  Waits for all of them to finish. If any of them raised an exception,
+  the first one (in funcs order) is re-raised.
+
+  Args:
+    funcs: list of callables, taking no argument.
+
+  Returns:
+    The list of the values returned by the callables, in funcs order.
+  """
+  results = [None] * len(funcs)
+  errors = [None] * len(funcs)
+
+  def run_one(i, func):
+    try:
+      results[i] = func()
+    except:
+      errors[i] = sys.exc_info()
+
+  threads = [threading.Thread(target=run_one, args=(i, func))
+             for i, func in enumerate(funcs)]
+  for t in threads:
+    t.start()
+  for t in threads:
+    t.join()
+  for error in errors:
+    if error:
+      raise error[0], error[1], error[2]
+  return results
+
+
 def validate_topology(ping_tablets=False):
   if ping_tablets:
     run_vtctl(['Validate', '-ping-tablets'])